@@ -3,6 +3,7 @@ package config
 import (
 	"fmt"
 	"os"
+	"strconv"
 
 	"github.com/joho/godotenv"
 )
@@ -11,6 +12,14 @@ type Config struct {
 	DatabaseURL string
 	JWTSecret   string
 
+	// Optional connection pool sizing; 0 means the store's default.
+	DBPoolMinConns int32
+	DBPoolMaxConns int32
+
+	// Optional synchronous_commit for every pooled connection; empty keeps the
+	// server's (durable) setting.
+	DBSynchronousCommit string
+
 	dbHost     string
 	dbPort     string
 	dbUser     string
@@ -28,6 +37,8 @@ func LoadConfig(path string) (*Config, error) {
 		dbPassword: os.Getenv("POSTGRES_PASSWORD"),
 		dbName:     os.Getenv("POSTGRES_DB"),
 		JWTSecret:  os.Getenv("SECRET_KEY"),
+
+		DBSynchronousCommit: os.Getenv("DB_SYNCHRONOUS_COMMIT"),
 	}
 
 	if cfg.dbHost == "" || cfg.dbPort == "" || cfg.dbUser == "" || cfg.dbName == "" {
@@ -37,9 +48,30 @@ func LoadConfig(path string) (*Config, error) {
 		return nil, fmt.Errorf("err: SECRET_KEY env variable is missing")
 	}
 
+	var err error
+	if cfg.DBPoolMinConns, err = getEnvInt32("DB_POOL_MIN_CONNS"); err != nil {
+		return nil, err
+	}
+	if cfg.DBPoolMaxConns, err = getEnvInt32("DB_POOL_MAX_CONNS"); err != nil {
+		return nil, err
+	}
+
 	cfg.DatabaseURL = fmt.Sprintf("postgresql://%s:%s@%s:%s/%s",
 		cfg.dbUser, cfg.dbPassword, cfg.dbHost, cfg.dbPort, cfg.dbName,
 	)
 
 	return cfg, nil
 }
+
+// getEnvInt32 reads an optional non-negative integer env variable, returning 0 if it is unset.
+func getEnvInt32(name string) (int32, error) {
+	value := os.Getenv(name)
+	if value == "" {
+		return 0, nil
+	}
+	n, err := strconv.ParseInt(value, 10, 32)
+	if err != nil || n < 0 {
+		return 0, fmt.Errorf("err: %s env variable must be a non-negative integer", name)
+	}
+	return int32(n), nil
+}
@@ -0,0 +1,132 @@
+// Package cache provides a small, size-bounded, concurrency-safe LRU cache
+// with optional per-entry expiry. It is used to keep hot lookups out of the
+// database.
+package cache
+
+import (
+	"container/list"
+	"sync"
+	"time"
+)
+
+// Cache is an LRU cache holding at most maxSize entries. When full, the least
+// recently used entry is evicted. If ttl is non-zero, entries also expire
+// ttl after they are set. All operations are O(1).
+type Cache[K comparable, V any] struct {
+	mu      sync.Mutex
+	order   *list.List // Front is most recently used
+	items   map[K]*list.Element
+	maxSize int
+	ttl     time.Duration
+}
+
+type entry[K comparable, V any] struct {
+	key       K
+	value     V
+	expiresAt time.Time // Zero means no expiry
+}
+
+// New creates a cache holding at most maxSize entries. A ttl of 0 means
+// entries only leave the cache through eviction.
+func New[K comparable, V any](maxSize int, ttl time.Duration) *Cache[K, V] {
+	return &Cache[K, V]{
+		order:   list.New(),
+		items:   make(map[K]*list.Element),
+		maxSize: maxSize,
+		ttl:     ttl,
+	}
+}
+
+// Get returns the cached value for key, if present and not yet expired.
+func (c *Cache[K, V]) Get(key K) (V, bool) {
+	c.mu.Lock()
+	defer c.mu.Unlock()
+
+	elem, ok := c.items[key]
+	if !ok {
+		var zero V
+		return zero, false
+	}
+	e := elem.Value.(*entry[K, V])
+	if !e.expiresAt.IsZero() && time.Now().After(e.expiresAt) {
+		c.removeLocked(elem)
+		var zero V
+		return zero, false
+	}
+	c.order.MoveToFront(elem)
+	return e.value, true
+}
+
+// Set stores value under key for the cache's TTL.
+func (c *Cache[K, V]) Set(key K, value V) {
+	c.SetUntil(key, value, time.Time{})
+}
+
+// SetUntil stores value under key until deadline or for the cache's TTL,
+// whichever is sooner. A zero deadline means the TTL alone applies.
+func (c *Cache[K, V]) SetUntil(key K, value V, deadline time.Time) {
+	c.mu.Lock()
+	defer c.mu.Unlock()
+	c.setLocked(key, value, deadline)
+}
+
+// setLocked implements SetUntil. c.mu must be held.
+func (c *Cache[K, V]) setLocked(key K, value V, deadline time.Time) {
+	var expiresAt time.Time
+	if c.ttl > 0 {
+		expiresAt = time.Now().Add(c.ttl)
+	}
+	if !deadline.IsZero() && (expiresAt.IsZero() || deadline.Before(expiresAt)) {
+		expiresAt = deadline
+	}
+
+	if elem, ok := c.items[key]; ok {
+		e := elem.Value.(*entry[K, V])
+		e.value = value
+		e.expiresAt = expiresAt
+		c.order.MoveToFront(elem)
+		return
+	}
+
+	c.items[key] = c.order.PushFront(&entry[K, V]{key: key, value: value, expiresAt: expiresAt})
+	if c.order.Len() > c.maxSize {
+		c.removeLocked(c.order.Back())
+	}
+}
+
+// Update atomically replaces the value under key with fn(current, ok), where
+// ok reports whether a live entry was present. A live entry keeps its original
+// expiry, so repeated updates can't keep a value alive past its TTL; otherwise
+// the result is stored for the cache's TTL.
+func (c *Cache[K, V]) Update(key K, fn func(current V, ok bool) V) {
+	c.mu.Lock()
+	defer c.mu.Unlock()
+
+	if elem, ok := c.items[key]; ok {
+		e := elem.Value.(*entry[K, V])
+		if e.expiresAt.IsZero() || !time.Now().After(e.expiresAt) {
+			e.value = fn(e.value, true)
+			c.order.MoveToFront(elem)
+			return
+		}
+		c.removeLocked(elem)
+	}
+	var zero V
+	c.setLocked(key, fn(zero, false), time.Time{})
+}
+
+// Delete removes key from the cache, if present.
+func (c *Cache[K, V]) Delete(key K) {
+	c.mu.Lock()
+	defer c.mu.Unlock()
+
+	if elem, ok := c.items[key]; ok {
+		c.removeLocked(elem)
+	}
+}
+
+// removeLocked drops elem from the cache. c.mu must be held.
+func (c *Cache[K, V]) removeLocked(elem *list.Element) {
+	c.order.Remove(elem)
+	delete(c.items, elem.Value.(*entry[K, V]).key)
+}
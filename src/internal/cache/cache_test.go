@@ -0,0 +1,160 @@
+package cache
+
+import (
+	"sync"
+	"testing"
+	"time"
+)
+
+func TestEvictsLeastRecentlyUsed(t *testing.T) {
+	c := New[string, int](2, 0)
+	c.Set("a", 1)
+	c.Set("b", 2)
+
+	// Touch "a" so "b" becomes the least recently used entry.
+	if _, ok := c.Get("a"); !ok {
+		t.Fatal("expected a to be cached")
+	}
+	c.Set("c", 3)
+
+	if _, ok := c.Get("b"); ok {
+		t.Error("expected b to be evicted")
+	}
+	if v, ok := c.Get("a"); !ok || v != 1 {
+		t.Errorf("Get(a) = %d, %v; want 1, true", v, ok)
+	}
+	if v, ok := c.Get("c"); !ok || v != 3 {
+		t.Errorf("Get(c) = %d, %v; want 3, true", v, ok)
+	}
+}
+
+func TestSetOverwritesWithoutEvicting(t *testing.T) {
+	c := New[string, int](2, 0)
+	c.Set("a", 1)
+	c.Set("b", 2)
+	c.Set("a", 10)
+
+	if v, ok := c.Get("a"); !ok || v != 10 {
+		t.Errorf("Get(a) = %d, %v; want 10, true", v, ok)
+	}
+	if _, ok := c.Get("b"); !ok {
+		t.Error("expected b to survive an overwrite of a")
+	}
+}
+
+func TestSetUntilDeadlineBeforeTTL(t *testing.T) {
+	c := New[string, int](10, time.Hour)
+	c.SetUntil("a", 1, time.Now().Add(-time.Second))
+
+	if _, ok := c.Get("a"); ok {
+		t.Error("expected an entry past its deadline to be expired despite the TTL")
+	}
+}
+
+func TestSetUntilTTLBeforeDeadline(t *testing.T) {
+	c := New[string, int](10, 10*time.Millisecond)
+	c.SetUntil("a", 1, time.Now().Add(time.Hour))
+	time.Sleep(30 * time.Millisecond)
+
+	if _, ok := c.Get("a"); ok {
+		t.Error("expected an entry past its TTL to be expired despite a later deadline")
+	}
+}
+
+func TestSetUntilDeadlineWithoutTTL(t *testing.T) {
+	c := New[string, int](10, 0)
+	c.SetUntil("expired", 1, time.Now().Add(-time.Second))
+	c.Set("forever", 2)
+
+	if _, ok := c.Get("expired"); ok {
+		t.Error("expected the deadline to apply when the cache has no TTL")
+	}
+	if _, ok := c.Get("forever"); !ok {
+		t.Error("expected an entry without TTL or deadline to stay cached")
+	}
+}
+
+func TestUpdateExpiredEntry(t *testing.T) {
+	c := New[string, int](10, 10*time.Millisecond)
+	c.Set("a", 5)
+	time.Sleep(30 * time.Millisecond)
+
+	c.Update("a", func(current int, ok bool) int {
+		if ok || current != 0 {
+			t.Errorf("Update saw %d, %v for an expired entry; want 0, false", current, ok)
+		}
+		return 7
+	})
+
+	if v, ok := c.Get("a"); !ok || v != 7 {
+		t.Errorf("Get(a) = %d, %v; want 7, true", v, ok)
+	}
+}
+
+func TestUpdateLiveEntryKeepsExpiry(t *testing.T) {
+	c := New[string, int](10, 50*time.Millisecond)
+	c.Set("a", 1)
+
+	c.Update("a", func(current int, ok bool) int {
+		if !ok || current != 1 {
+			t.Errorf("Update saw %d, %v; want 1, true", current, ok)
+		}
+		return current + 1
+	})
+	if v, ok := c.Get("a"); !ok || v != 2 {
+		t.Errorf("Get(a) = %d, %v; want 2, true", v, ok)
+	}
+
+	time.Sleep(80 * time.Millisecond)
+	if _, ok := c.Get("a"); ok {
+		t.Error("expected Update not to extend the entry's TTL")
+	}
+}
+
+func TestDelete(t *testing.T) {
+	c := New[string, int](10, 0)
+	c.Set("a", 1)
+	c.Set("b", 2)
+	c.Delete("a")
+	c.Delete("missing") // No-op
+
+	if _, ok := c.Get("a"); ok {
+		t.Error("expected a to be deleted")
+	}
+	if _, ok := c.Get("b"); !ok {
+		t.Error("expected b to be untouched")
+	}
+}
+
+// Run with -race to check the locking.
+func TestConcurrentUse(t *testing.T) {
+	const maxSize = 16
+	c := New[int, int](maxSize, time.Millisecond)
+
+	var wg sync.WaitGroup
+	for g := 0; g < 8; g++ {
+		wg.Add(1)
+		go func(g int) {
+			defer wg.Done()
+			for i := 0; i < 1000; i++ {
+				key := (g*1000 + i) % 64
+				c.Set(key, i)
+				c.Get(key)
+				c.Update(key, func(current int, ok bool) int { return current + 1 })
+				if i%10 == 0 {
+					c.Delete(key)
+				}
+			}
+		}(g)
+	}
+	wg.Wait()
+
+	c.mu.Lock()
+	defer c.mu.Unlock()
+	if c.order.Len() != len(c.items) {
+		t.Errorf("list has %d entries but map has %d", c.order.Len(), len(c.items))
+	}
+	if len(c.items) > maxSize {
+		t.Errorf("cache holds %d entries; want at most %d", len(c.items), maxSize)
+	}
+}
@@ -4,6 +4,7 @@ import (
 	"log"
 	"net/http"
 	"os"
+	"time"
 
 	"cryptachat-server/config"
 	"cryptachat-server/myhttp" // Your http package
@@ -22,7 +23,11 @@ func main() {
 	}
 
 	// ... (database connection logic)
-	dbStore, err := store.NewPostgresStore(cfg.DatabaseURL, "./store/schema.sql")
+	dbStore, err := store.NewPostgresStore(cfg.DatabaseURL, "./store/schema.sql", store.PoolOptions{
+		MinConns:          cfg.DBPoolMinConns,
+		MaxConns:          cfg.DBPoolMaxConns,
+		SynchronousCommit: cfg.DBSynchronousCommit,
+	})
 	if err != nil {
 		log.Fatalf("FATAL: could not connect to database: %v", err)
 	}
@@ -49,8 +54,17 @@ func main() {
 	}
 
 	// Start server
+	// net/http already serves each request on its own goroutine; the timeouts
+	// stop slow or idle clients from holding connections open indefinitely.
+	// No read/write timeouts are set because /ws connections are long-lived.
+	httpServer := &http.Server{
+		Addr:              ":" + port,
+		Handler:           server,
+		ReadHeaderTimeout: 10 * time.Second,
+		IdleTimeout:       120 * time.Second,
+	}
 	log.Printf("Starting server on :%s", port)
-	if err := http.ListenAndServe(":"+port, server); err != nil {
+	if err := httpServer.ListenAndServe(); err != nil {
 		log.Fatalf("FATAL: could not start server: %v", err)
 	}
 }
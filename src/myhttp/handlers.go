@@ -1,32 +1,55 @@
 package myhttp
 
 import (
+	"bytes"
 	"encoding/json"
 	"fmt"
-	"log"
 	"net/http"
 	"strconv"
 	"strings"
+	"sync"
 	"time"
 
 	"cryptachat-server/store" // Import store
 
 	"github.com/golang-jwt/jwt/v5"
-	"golang.org/x/crypto/bcrypt"
 )
 
 // A helper function to write JSON errors
 func (s *Server) writeJSONError(w http.ResponseWriter, message string, status int) {
-	w.Header().Set("Content-Type", "application/json")
-	w.WriteHeader(status)
-	json.NewEncoder(w).Encode(map[string]string{"message": message})
+	s.writeJSON(w, map[string]string{"message": message}, status)
+}
+
+// jsonBufferPool holds reusable buffers for encoding responses.
+var jsonBufferPool = sync.Pool{
+	New: func() interface{} { return new(bytes.Buffer) },
 }
 
-// A helper function to write JSON responses
+// Buffers that grew past this size (e.g. a large /get_messages page) are
+// dropped instead of being kept alive in the pool.
+const maxPooledJSONBuffer = 1 << 20
+
+// A helper function to write JSON responses.
+// The body is encoded into a pooled buffer first, so it is sent in one write
+// with a Content-Length, and an encoding failure can still become a 500.
 func (s *Server) writeJSON(w http.ResponseWriter, data interface{}, status int) {
+	buf := jsonBufferPool.Get().(*bytes.Buffer)
+	buf.Reset()
+	defer func() {
+		if buf.Cap() <= maxPooledJSONBuffer {
+			jsonBufferPool.Put(buf)
+		}
+	}()
+
+	if err := json.NewEncoder(buf).Encode(data); err != nil {
+		s.writeJSONError(w, fmt.Sprintf("Failed to encode response: %v", err), http.StatusInternalServerError)
+		return
+	}
+
 	w.Header().Set("Content-Type", "application/json")
+	w.Header().Set("Content-Length", strconv.Itoa(buf.Len()))
 	w.WriteHeader(status)
-	json.NewEncoder(w).Encode(data)
+	w.Write(buf.Bytes())
 }
 
 // --- Auth Handlers ---
@@ -55,7 +78,7 @@ func (s *Server) handleRegister() http.HandlerFunc {
 		}
 
 		// 3. Hash the password (using bcrypt)
-		hash, err := bcrypt.GenerateFromPassword([]byte(payload.Password), bcrypt.DefaultCost)
+		hash, err := s.hashPassword(r.Context(), payload.Password)
 		if err != nil {
 			s.writeJSONError(w, fmt.Sprintf("Failed to hash password: %v", err), http.StatusInternalServerError)
 			return
@@ -102,19 +125,12 @@ func (s *Server) handleLogin() http.HandlerFunc {
 		}
 
 		// 4. Check password
-		if err := bcrypt.CompareHashAndPassword([]byte(user.PasswordHash), []byte(payload.Password)); err != nil {
+		if err := s.comparePassword(r.Context(), user.PasswordHash, payload.Password); err != nil {
 			s.writeJSONError(w, "Could not verify! Check username/password.", http.StatusUnauthorized)
 			return
 		}
 
 		// 5. Create JWT token
-		// Define your claims struct (must match what auth middleware expects)
-		type AppClaims struct {
-			UserID   int    `json:"user_id"`
-			Username string `json:"username"`
-			jwt.RegisteredClaims
-		}
-
 		claims := AppClaims{
 			UserID:   user.ID,
 			Username: user.Username,
@@ -125,7 +141,7 @@ func (s *Server) handleLogin() http.HandlerFunc {
 		}
 
 		token := jwt.NewWithClaims(jwt.SigningMethodHS256, claims)
-		tokenString, err := token.SignedString([]byte(s.cfg.JWTSecret))
+		tokenString, err := token.SignedString(s.jwtKey)
 		if err != nil {
 			s.writeJSONError(w, fmt.Sprintf("Error creating token: %v", err), http.StatusInternalServerError)
 			return
@@ -310,6 +326,12 @@ func (s *Server) handleGetContacts() http.HandlerFunc {
 
 // --- Message Handlers ---
 
+// Page size bounds for /get_messages.
+const (
+	defaultMessagesLimit = 200
+	maxMessagesLimit     = 1000
+)
+
 type sendMessagePayload struct {
 	RecipientUsername string `json:"recipient_username"`
 	SenderBlob        string `json:"sender_blob"`
@@ -335,8 +357,8 @@ func (s *Server) handleSendMessage() http.HandlerFunc {
 			return
 		}
 
-		// 1. Send message and get back the new message's ID and the recipient's ID
-		newID, recipientID, err := s.store.SendMessage(r.Context(), currentUser.ID, payload.RecipientUsername, payload.SenderBlob, payload.RecipientBlob)
+		// 1. Send message and get back the new message's ID, the recipient's ID and its timestamp
+		newID, recipientID, timestamp, err := s.store.SendMessage(r.Context(), currentUser.ID, payload.RecipientUsername, payload.SenderBlob, payload.RecipientBlob)
 		if err != nil {
 			if strings.Contains(err.Error(), "recipient user not found") {
 				s.writeJSONError(w, "Recipient user not found.", http.StatusNotFound)
@@ -347,28 +369,100 @@ func (s *Server) handleSendMessage() http.HandlerFunc {
 		}
 
 		// --- WebSocket Push Logic ---
-		// 2. Get the message object as the SENDER sees it
-		msgForSender, err := s.store.GetMessageForUser(r.Context(), newID, currentUser.ID)
-		if err != nil {
-			// Log this, but don't fail the HTTP request. The message is saved.
-			log.Printf("WS: could not get message %d for sender %d: %v", newID, currentUser.ID, err)
-		} else {
-			// 3. Push to sender's websocket (so all their devices get the new message)
-			s.hub.PushToUser(currentUser.ID, msgForSender)
+		// 2. Push to both users' websockets (so all their devices get the new message)
+		s.pushNewMessage(currentUser, store.SentMessage{ID: newID, RecipientID: recipientID, Timestamp: timestamp},
+			payload.SenderBlob, payload.RecipientBlob)
+		// --- End WebSocket Push Logic ---
+
+		// 3. Send original HTTP success response
+		s.writeJSON(w, map[string]string{"message": "Message sent successfully."}, http.StatusCreated)
+	}
+}
+
+// pushNewMessage pushes a stored message to the sender's and the recipient's
+// websockets, each with their own copy of the blob. Everything the message
+// contains is already known, so there's no need to read it back.
+func (s *Server) pushNewMessage(sender *store.User, sent store.SentMessage, senderBlob, recipientBlob string) {
+	// The message object as the SENDER sees it
+	msgForSender := &store.Message{
+		ID:             sent.ID,
+		SenderID:       sender.ID,
+		RecipientID:    sent.RecipientID,
+		Timestamp:      sent.Timestamp,
+		SenderUsername: sender.Username,
+		EncryptedBlob:  senderBlob,
+	}
+	s.hub.PushToUser(sender.ID, msgForSender)
+
+	// The RECIPIENT sees the same message with their own blob
+	msgForRecipient := *msgForSender
+	msgForRecipient.EncryptedBlob = recipientBlob
+	s.hub.PushToUser(sent.RecipientID, &msgForRecipient)
+}
+
+// Upper bound on the number of messages accepted by one /send_messages call.
+const maxBatchMessages = 100
+
+type sendMessagesPayload struct {
+	Messages []sendMessagePayload `json:"messages"`
+}
+
+// handleSendMessages stores a batch of messages (e.g. ones a client queued while
+// offline) with one transaction and one commit, instead of one request each.
+func (s *Server) handleSendMessages() http.HandlerFunc {
+	return func(w http.ResponseWriter, r *http.Request) {
+		currentUser, ok := s.getUserFromContext(r)
+		if !ok {
+			s.writeJSONError(w, "Could not get user from context", http.StatusInternalServerError)
+			return
 		}
 
-		// 4. Get the message object as the RECIPIENT sees it
-		msgForRecipient, err := s.store.GetMessageForUser(r.Context(), newID, recipientID)
+		var payload sendMessagesPayload
+		if err := json.NewDecoder(r.Body).Decode(&payload); err != nil {
+			s.writeJSONError(w, "Invalid JSON body", http.StatusBadRequest)
+			return
+		}
+
+		if len(payload.Messages) == 0 {
+			s.writeJSONError(w, "Missing messages", http.StatusBadRequest)
+			return
+		}
+		if len(payload.Messages) > maxBatchMessages {
+			s.writeJSONError(w, fmt.Sprintf("Too many messages, at most %d per request", maxBatchMessages), http.StatusBadRequest)
+			return
+		}
+
+		outgoing := make([]store.OutgoingMessage, len(payload.Messages))
+		for i, msg := range payload.Messages {
+			if msg.RecipientUsername == "" || msg.SenderBlob == "" || msg.RecipientBlob == "" {
+				s.writeJSONError(w, fmt.Sprintf("Message %d: missing recipient_username, sender_blob, or recipient_blob", i), http.StatusBadRequest)
+				return
+			}
+			outgoing[i] = store.OutgoingMessage{
+				RecipientUsername: msg.RecipientUsername,
+				SenderBlob:        msg.SenderBlob,
+				RecipientBlob:     msg.RecipientBlob,
+			}
+		}
+
+		// 1. Store all messages; either all of them are sent or none are
+		sent, err := s.store.SendMessages(r.Context(), currentUser.ID, outgoing)
 		if err != nil {
-			log.Printf("WS: could not get message %d for recipient %d: %v", newID, recipientID, err)
-		} else {
-			// 5. Push to recipient's websocket
-			s.hub.PushToUser(recipientID, msgForRecipient)
+			if strings.Contains(err.Error(), "recipient user not found") {
+				s.writeJSONError(w, "Recipient user not found.", http.StatusNotFound)
+			} else {
+				s.writeJSONError(w, err.Error(), http.StatusInternalServerError)
+			}
+			return
 		}
-		// --- End WebSocket Push Logic ---
 
-		// 6. Send original HTTP success response
-		s.writeJSON(w, map[string]string{"message": "Message sent successfully."}, http.StatusCreated)
+		// 2. Push each message to both users' websockets
+		for i, msg := range outgoing {
+			s.pushNewMessage(currentUser, sent[i], msg.SenderBlob, msg.RecipientBlob)
+		}
+
+		// 3. Send HTTP success response
+		s.writeJSON(w, map[string]string{"message": fmt.Sprintf("%d messages sent successfully.", len(sent))}, http.StatusCreated)
 	}
 }
 
@@ -396,7 +490,28 @@ func (s *Server) handleGetMessages() http.HandlerFunc {
 			return
 		}
 
-		messages, err := s.store.GetMessages(r.Context(), currentUser.ID, partnerUsername, sinceID)
+		beforeID := 0
+		if beforeIDStr := r.URL.Query().Get("before_id"); beforeIDStr != "" {
+			beforeID, err = strconv.Atoi(beforeIDStr)
+			if err != nil || beforeID <= 0 {
+				s.writeJSONError(w, "Invalid before_id parameter, must be a positive integer.", http.StatusBadRequest)
+				return
+			}
+		}
+
+		limit := defaultMessagesLimit
+		if limitStr := r.URL.Query().Get("limit"); limitStr != "" {
+			limit, err = strconv.Atoi(limitStr)
+			if err != nil || limit <= 0 {
+				s.writeJSONError(w, "Invalid limit parameter, must be a positive integer.", http.StatusBadRequest)
+				return
+			}
+			if limit > maxMessagesLimit {
+				limit = maxMessagesLimit
+			}
+		}
+
+		messages, err := s.store.GetMessages(r.Context(), currentUser.ID, partnerUsername, sinceID, beforeID, limit)
 		if err != nil {
 			if strings.Contains(err.Error(), "partner user not found") {
 				s.writeJSONError(w, "Partner user not found.", http.StatusNotFound)
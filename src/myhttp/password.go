@@ -0,0 +1,41 @@
+package myhttp
+
+import (
+	"context"
+
+	"golang.org/x/crypto/bcrypt"
+)
+
+// acquireHashSlot blocks until a hashing slot is free or ctx is done.
+func (s *Server) acquireHashSlot(ctx context.Context) error {
+	select {
+	case s.hashSlots <- struct{}{}:
+		return nil
+	case <-ctx.Done():
+		return ctx.Err()
+	}
+}
+
+func (s *Server) releaseHashSlot() {
+	<-s.hashSlots
+}
+
+// hashPassword hashes a password with bcrypt within the hashing concurrency limit.
+func (s *Server) hashPassword(ctx context.Context, password string) ([]byte, error) {
+	if err := s.acquireHashSlot(ctx); err != nil {
+		return nil, err
+	}
+	defer s.releaseHashSlot()
+
+	return bcrypt.GenerateFromPassword([]byte(password), bcrypt.DefaultCost)
+}
+
+// comparePassword checks a password against a bcrypt hash within the hashing concurrency limit.
+func (s *Server) comparePassword(ctx context.Context, hash string, password string) error {
+	if err := s.acquireHashSlot(ctx); err != nil {
+		return err
+	}
+	defer s.releaseHashSlot()
+
+	return bcrypt.CompareHashAndPassword([]byte(hash), []byte(password))
+}
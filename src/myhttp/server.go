@@ -2,9 +2,28 @@ package myhttp
 
 import (
 	"cryptachat-server/config"
+	"cryptachat-server/internal/cache"
 	"cryptachat-server/store" // Your store package
 	"cryptachat-server/websockets"
 	"net/http"
+	"runtime"
+	"time"
+
+	"github.com/golang-jwt/jwt/v5"
+)
+
+// Authenticated users are cached by ID so the auth middleware doesn't have to
+// re-read the users table on every request made with the same token.
+const (
+	userCacheSize = 10_000
+	userCacheTTL  = 60 * time.Second
+)
+
+// Recently verified tokens are cached verbatim so that the signature check and
+// claims parsing are skipped too. Entries never outlive the token's own expiry.
+const (
+	tokenCacheSize = 4096
+	tokenCacheTTL  = 5 * time.Second
 )
 
 // Server holds the dependencies for your HTTP handlers.
@@ -13,15 +32,32 @@ type Server struct {
 	cfg   *config.Config
 	mux   *http.ServeMux
 	hub   *websockets.Hub // <-- Add the hub
+
+	userCache  *cache.Cache[int, *store.User]
+	tokenCache *cache.Cache[string, *store.User]
+
+	// hashSlots bounds concurrent bcrypt operations. Hashing is deliberately
+	// CPU-expensive, and a burst of logins/registrations would otherwise
+	// occupy every core and stall all other handlers.
+	hashSlots chan struct{}
+
+	jwtParser *jwt.Parser
+	jwtKey    []byte // cfg.JWTSecret, converted once for signing and verifying
 }
 
 // NewServer creates a new server instance.
-func NewServer(cfg *config.Config, store *store.PostgresStore, hub *websockets.Hub) *Server {
+func NewServer(cfg *config.Config, dbStore *store.PostgresStore, hub *websockets.Hub) *Server {
 	s := &Server{
-		store: store,
+		store: dbStore,
 		cfg:   cfg,
 		mux:   http.NewServeMux(),
 		hub:   hub, // <-- Set the hub
+
+		userCache:  cache.New[int, *store.User](userCacheSize, userCacheTTL),
+		tokenCache: cache.New[string, *store.User](tokenCacheSize, tokenCacheTTL),
+		hashSlots:  make(chan struct{}, runtime.NumCPU()),
+		jwtParser:  newJWTParser(),
+		jwtKey:     []byte(cfg.JWTSecret),
 	}
 	s.registerRoutes() // Call the method to register all routes
 	return s
@@ -53,6 +89,7 @@ func (s *Server) registerRoutes() {
 
 	// Message routes (Protected)
 	s.mux.HandleFunc("POST /send_message", s.jwtAuthMiddleware(s.handleSendMessage()))
+	s.mux.HandleFunc("POST /send_messages", s.jwtAuthMiddleware(s.handleSendMessages()))
 	// The /get_messages route is still useful for loading history
 	s.mux.HandleFunc("GET /get_messages", s.jwtAuthMiddleware(s.handleGetMessages()))
 
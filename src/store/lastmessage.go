@@ -0,0 +1,65 @@
+package store
+
+import (
+	"context"
+	"time"
+)
+
+// conversationKey identifies the conversation between two users, regardless of direction.
+type conversationKey struct {
+	lowID, highID int
+}
+
+func newConversationKey(a, b int) conversationKey {
+	if a > b {
+		a, b = b, a
+	}
+	return conversationKey{lowID: a, highID: b}
+}
+
+// Bounds on the last-message-ID cache. An evicted or expired conversation is
+// simply re-read from the database on its next poll. The short TTL lets polls
+// pick up messages inserted outside this process (another replica, a restore)
+// within a few seconds.
+const (
+	lastMessageCacheSize = 100_000
+	lastMessageCacheTTL  = 5 * time.Second
+)
+
+// observeLastMessage records id as the conversation's last message if it's newer
+// than what is cached. Keeping the maximum makes concurrent sends and lazy
+// seeding order-independent.
+func (s *PostgresStore) observeLastMessage(key conversationKey, id int) {
+	s.lastMessages.Update(key, func(current int, ok bool) int {
+		if ok && current > id {
+			return current
+		}
+		return id
+	})
+}
+
+// lastMessageID returns the highest message ID between two users (0 if they
+// have none), reading it from the database only when it isn't cached.
+func (s *PostgresStore) lastMessageID(ctx context.Context, userA, userB int) (int, error) {
+	key := newConversationKey(userA, userB)
+	if id, ok := s.lastMessages.Get(key); ok {
+		return id, nil
+	}
+
+	var id int
+	err := s.db.QueryRow(ctx,
+		`
+        SELECT COALESCE(GREATEST(
+            (SELECT MAX(id) FROM messages WHERE sender_id = $1 AND recipient_id = $2),
+            (SELECT MAX(id) FROM messages WHERE sender_id = $2 AND recipient_id = $1)
+        ), 0)
+        `,
+		userA, userB,
+	).Scan(&id)
+	if err != nil {
+		return 0, err
+	}
+
+	s.observeLastMessage(key, id)
+	return id, nil
+}
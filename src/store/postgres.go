@@ -2,7 +2,9 @@ package store
 
 import (
 	"context"
+	"cryptachat-server/internal/cache"
 	"fmt"
+	"math"
 	"os"
 	"time"
 
@@ -14,8 +16,18 @@ import (
 // PostgresStore holds the connection pool.
 type PostgresStore struct {
 	db *pgxpool.Pool
+
+	lastMessages *cache.Cache[conversationKey, int]
+	userIDs      *cache.Cache[string, int]
 }
 
+// Usernames are unique and never change, so a cached username -> ID entry is
+// only wrong once the user is deleted. The TTL bounds how long that can last.
+const (
+	userIDCacheSize = 50_000
+	userIDCacheTTL  = 5 * time.Minute
+)
+
 // User struct to hold user data
 type User struct {
 	ID           int    `json:"id"`
@@ -23,9 +35,48 @@ type User struct {
 	PasswordHash string `json:"-"` // Omit from JSON responses
 }
 
+// Default connection pool sizing. Connections are leased per query and returned
+// automatically, so MinConns keeps a few warm ones around to avoid paying the
+// TCP + auth handshake on the first requests after startup or an idle period.
+const (
+	poolMinConns = 5
+	poolMaxConns = 50
+)
+
+// PoolOptions tunes the connection pool. Zero values use the defaults above.
+type PoolOptions struct {
+	MinConns int32
+	MaxConns int32
+
+	// SynchronousCommit, if set, is sent as a startup parameter on every
+	// connection. "off" skips the WAL flush wait on commit: a database crash can
+	// then lose the last few hundred milliseconds of acknowledged writes, but
+	// never corrupts data.
+	SynchronousCommit string
+}
+
 // NewPostgresStore creates a new store, connects to the DB, and initializes the schema.
-func NewPostgresStore(databaseURL string, schemaPath string) (*PostgresStore, error) {
-	pool, err := pgxpool.New(context.Background(), databaseURL)
+func NewPostgresStore(databaseURL string, schemaPath string, opts PoolOptions) (*PostgresStore, error) {
+	poolCfg, err := pgxpool.ParseConfig(databaseURL)
+	if err != nil {
+		return nil, fmt.Errorf("invalid database URL: %v", err)
+	}
+	poolCfg.MinConns = poolMinConns
+	if opts.MinConns > 0 {
+		poolCfg.MinConns = opts.MinConns
+	}
+	poolCfg.MaxConns = poolMaxConns
+	if opts.MaxConns > 0 {
+		poolCfg.MaxConns = opts.MaxConns
+	}
+	if poolCfg.MinConns > poolCfg.MaxConns {
+		return nil, fmt.Errorf("invalid pool size: min conns (%d) exceeds max conns (%d)", poolCfg.MinConns, poolCfg.MaxConns)
+	}
+	if opts.SynchronousCommit != "" {
+		poolCfg.ConnConfig.RuntimeParams["synchronous_commit"] = opts.SynchronousCommit
+	}
+
+	pool, err := pgxpool.NewWithConfig(context.Background(), poolCfg)
 	if err != nil {
 		return nil, fmt.Errorf("unable to connect to database: %v", err)
 	}
@@ -48,7 +99,11 @@ func NewPostgresStore(databaseURL string, schemaPath string) (*PostgresStore, er
 		return nil, fmt.Errorf("failed to apply schema: %v", err)
 	}
 
-	return &PostgresStore{db: pool}, nil
+	return &PostgresStore{
+		db:           pool,
+		lastMessages: cache.New[conversationKey, int](lastMessageCacheSize, lastMessageCacheTTL),
+		userIDs:      cache.New[string, int](userIDCacheSize, userIDCacheTTL),
+	}, nil
 }
 
 // Close closes the database connection pool.
@@ -68,10 +123,11 @@ func isUniqueViolation(err error) bool {
 
 // RegisterUser is the Go equivalent of the INSERT query in your /register endpoint.
 func (s *PostgresStore) RegisterUser(ctx context.Context, username string, passwordHash string) error {
-	// db.Exec is for queries that don't return rows.
-	_, err := s.db.Exec(ctx,
-		"INSERT INTO users (username, password_hash) VALUES ($1, $2)",
-		username, passwordHash)
+	var id int
+	err := s.db.QueryRow(ctx,
+		"INSERT INTO users (username, password_hash) VALUES ($1, $2) RETURNING id",
+		username, passwordHash,
+	).Scan(&id)
 
 	if err != nil {
 		if isUniqueViolation(err) {
@@ -80,6 +136,8 @@ func (s *PostgresStore) RegisterUser(ctx context.Context, username string, passw
 		return fmt.Errorf("database error: %v", err)
 	}
 
+	// Replace any stale mapping left behind by a deleted user of the same name.
+	s.userIDs.Set(username, id)
 	return nil
 }
 
@@ -101,12 +159,13 @@ func (s *PostgresStore) GetUserByUsername(ctx context.Context, username string)
 }
 
 // GetUserByID fetches a user for the auth middleware.
+// The password hash is not needed there, so it is not selected.
 func (s *PostgresStore) GetUserByID(ctx context.Context, id int) (*User, error) {
 	var user User
 	err := s.db.QueryRow(ctx,
-		"SELECT id, username, password_hash FROM users WHERE id = $1",
+		"SELECT id, username FROM users WHERE id = $1",
 		id,
-	).Scan(&user.ID, &user.Username, &user.PasswordHash)
+	).Scan(&user.ID, &user.Username)
 
 	if err != nil {
 		if err == pgx.ErrNoRows {
@@ -118,15 +177,27 @@ func (s *PostgresStore) GetUserByID(ctx context.Context, id int) (*User, error)
 }
 
 // GetUserIDByUsername is a helper to get just the ID for a given username.
+// Found IDs are cached, so repeat lookups of the same name skip the database.
 func (s *PostgresStore) GetUserIDByUsername(ctx context.Context, username string) (int, error) {
+	if id, ok := s.userIDs.Get(username); ok {
+		return id, nil
+	}
+	return s.lookupUserID(ctx, username)
+}
+
+// lookupUserID reads a user's ID from the database, bypassing the cache, and
+// refreshes or invalidates the cached entry to match.
+func (s *PostgresStore) lookupUserID(ctx context.Context, username string) (int, error) {
 	var id int
 	err := s.db.QueryRow(ctx, "SELECT id FROM users WHERE username = $1", username).Scan(&id)
 	if err != nil {
 		if err == pgx.ErrNoRows {
+			s.userIDs.Delete(username)
 			return 0, fmt.Errorf("user not found")
 		}
 		return 0, fmt.Errorf("database error: %v", err)
 	}
+	s.userIDs.Set(username, id)
 	return id, nil
 }
 
@@ -173,26 +244,36 @@ func (s *PostgresStore) GetPublicKeyByUsername(ctx context.Context, username str
 
 // RequestChat creates a new 'pending' chat request.
 func (s *PostgresStore) RequestChat(ctx context.Context, requesterID int, recipientUsername string) error {
-	recipientID, err := s.GetUserIDByUsername(ctx, recipientUsername)
-	if err != nil {
-		return fmt.Errorf("recipient user not found")
-	}
-
-	if requesterID == recipientID {
-		return fmt.Errorf("cannot send chat request to yourself")
-	}
-
-	_, err = s.db.Exec(ctx,
-		"INSERT INTO chat_requests (requester_id, requested_id, status) VALUES ($1, $2, 'pending')",
-		requesterID, recipientID,
+	// Resolve the recipient and insert in a single statement. An existing
+	// request for the pair is skipped by the unique constraint, not raised.
+	cmdTag, err := s.db.Exec(ctx,
+		`
+        INSERT INTO chat_requests (requester_id, requested_id, status)
+        SELECT $1::integer, u.id, 'pending'
+        FROM users u
+        WHERE u.username = $2 AND u.id <> $1::integer
+        ON CONFLICT (requester_id, requested_id) DO NOTHING
+        `,
+		requesterID, recipientUsername,
 	)
 
 	if err != nil {
-		if isUniqueViolation(err) {
-			return fmt.Errorf("chat request already pending or accepted")
-		}
 		return fmt.Errorf("database error: %v", err)
 	}
+
+	if cmdTag.RowsAffected() == 0 {
+		// Nothing was inserted: the recipient doesn't exist, is the requester,
+		// or a request already exists. Only this path needs the extra lookup,
+		// and it skips the cache so a deleted recipient is reported as such.
+		recipientID, err := s.lookupUserID(ctx, recipientUsername)
+		if err != nil {
+			return fmt.Errorf("recipient user not found")
+		}
+		if recipientID == requesterID {
+			return fmt.Errorf("cannot send chat request to yourself")
+		}
+		return fmt.Errorf("chat request already pending or accepted")
+	}
 	return nil
 }
 
@@ -229,18 +310,15 @@ func (s *PostgresStore) GetChatRequests(ctx context.Context, requestedID int) ([
 
 // AcceptChat updates a 'pending' request to 'accepted'.
 func (s *PostgresStore) AcceptChat(ctx context.Context, requestedID int, requesterUsername string) error {
-	requesterID, err := s.GetUserIDByUsername(ctx, requesterUsername)
-	if err != nil {
-		return fmt.Errorf("requester user not found")
-	}
-
+	// Resolve the requester inside the UPDATE to avoid a separate lookup.
 	cmdTag, err := s.db.Exec(ctx,
 		`
-        UPDATE chat_requests
+        UPDATE chat_requests cr
         SET status = 'accepted'
-        WHERE requester_id = $1 AND requested_id = $2 AND status = 'pending'
+        FROM users u
+        WHERE u.username = $1 AND cr.requester_id = u.id AND cr.requested_id = $2 AND cr.status = 'pending'
         `,
-		requesterID, requestedID)
+		requesterUsername, requestedID)
 
 	if err != nil {
 		return fmt.Errorf("database error: %v", err)
@@ -254,78 +332,168 @@ func (s *PostgresStore) AcceptChat(ctx context.Context, requestedID int, request
 
 // GetContacts fetches all accepted chat partners.
 func (s *PostgresStore) GetContacts(ctx context.Context, myID int) ([]string, error) {
-	contacts := make(map[string]struct{}) // Use a map as a set
-
-	// 1. People I requested
+	// People I requested UNION people who requested me. UNION also removes
+	// duplicates, so a pair that requested each other is only listed once.
 	rows, err := s.db.Query(ctx,
 		`
         SELECT u.username
         FROM chat_requests cr
         JOIN users u ON u.id = cr.requested_id
         WHERE cr.requester_id = $1 AND cr.status = 'accepted'
+        UNION
+        SELECT u.username
+        FROM chat_requests cr
+        JOIN users u ON u.id = cr.requester_id
+        WHERE cr.requested_id = $1 AND cr.status = 'accepted'
         `, myID)
 	if err != nil {
-		return nil, fmt.Errorf("database error (query 1): %v", err)
+		return nil, fmt.Errorf("database error: %v", err)
 	}
 	defer rows.Close()
 
+	contactList := make([]string, 0)
 	for rows.Next() {
 		var username string
 		if err := rows.Scan(&username); err != nil {
-			return nil, fmt.Errorf("database scan error (query 1): %v", err)
+			return nil, fmt.Errorf("database scan error: %v", err)
 		}
-		contacts[username] = struct{}{}
+		contactList = append(contactList, username)
 	}
+	return contactList, nil
+}
 
-	// 2. People who requested me
-	rows, err = s.db.Query(ctx,
+// ---- Message Methods ----
+
+// SendMessage inserts a new encrypted message and returns its ID, the recipient's ID,
+// and the stored timestamp, which together with the inputs describe the whole message.
+func (s *PostgresStore) SendMessage(ctx context.Context, senderID int, recipientUsername, senderBlob, recipientBlob string) (int, int, time.Time, error) {
+	var newID, recipientID int
+	var timestamp time.Time
+	// Resolve the recipient and insert in a single statement, using
+	// RETURNING to get the new message's ID, the recipient's ID and the timestamp.
+	err := s.db.QueryRow(ctx,
 		`
-        SELECT u.username
-        FROM chat_requests cr
-        JOIN users u ON u.id = cr.requester_id
-        WHERE cr.requested_id = $1 AND cr.status = 'accepted'
-        `, myID)
+        INSERT INTO messages (sender_id, recipient_id, sender_blob, recipient_blob)
+        SELECT $1::integer, u.id, $3::text, $4::text
+        FROM users u
+        WHERE u.username = $2
+        RETURNING id, recipient_id, timestamp
+        `,
+		senderID, recipientUsername, senderBlob, recipientBlob,
+	).Scan(&newID, &recipientID, &timestamp)
+
 	if err != nil {
-		return nil, fmt.Errorf("database error (query 2): %v", err)
+		if err == pgx.ErrNoRows {
+			return 0, 0, time.Time{}, fmt.Errorf("recipient user not found")
+		}
+		return 0, 0, time.Time{}, fmt.Errorf("database error: %v", err)
 	}
-	defer rows.Close()
 
-	for rows.Next() {
-		var username string
-		if err := rows.Scan(&username); err != nil {
-			return nil, fmt.Errorf("database scan error (query 2): %v", err)
+	s.observeLastMessage(newConversationKey(senderID, recipientID), newID)
+	return newID, recipientID, timestamp, nil
+}
+
+// OutgoingMessage is one message of a SendMessages batch.
+type OutgoingMessage struct {
+	RecipientUsername string
+	SenderBlob        string
+	RecipientBlob     string
+}
+
+// SentMessage describes a message stored by SendMessages.
+type SentMessage struct {
+	ID          int
+	RecipientID int
+	Timestamp   time.Time
+}
+
+// SendMessages inserts a batch of encrypted messages from one sender in a single
+// transaction. Recipients are resolved up front in one query; if any of them
+// doesn't exist, nothing is inserted. Results are in the same order as msgs.
+func (s *PostgresStore) SendMessages(ctx context.Context, senderID int, msgs []OutgoingMessage) ([]SentMessage, error) {
+	// 1. Resolve every distinct recipient in one round-trip
+	usernames := make([]string, 0, len(msgs))
+	seen := make(map[string]struct{}, len(msgs))
+	for _, msg := range msgs {
+		if _, ok := seen[msg.RecipientUsername]; !ok {
+			seen[msg.RecipientUsername] = struct{}{}
+			usernames = append(usernames, msg.RecipientUsername)
 		}
-		contacts[username] = struct{}{}
 	}
 
-	// Convert map keys to slice
-	contactList := make([]string, 0, len(contacts))
-	for contact := range contacts {
-		contactList = append(contactList, contact)
+	recipientIDs, err := s.lookupUserIDs(ctx, usernames)
+	if err != nil {
+		return nil, err
 	}
-	return contactList, nil
-}
 
-// ---- Message Methods ----
+	for _, username := range usernames {
+		if _, ok := recipientIDs[username]; !ok {
+			return nil, fmt.Errorf("recipient user not found: %s", username)
+		}
+	}
 
-// SendMessage inserts a new encrypted message.
-func (s *PostgresStore) SendMessage(ctx context.Context, senderID int, recipientUsername, senderBlob, recipientBlob string) (int, int, error) {
-	recipientID, err := s.GetUserIDByUsername(ctx, recipientUsername)
+	// 2. Queue all inserts as one batch inside one transaction: a single
+	// round-trip and a single commit, however many messages there are.
+	tx, err := s.db.Begin(ctx)
 	if err != nil {
-		return 0, 0, fmt.Errorf("recipient user not found")
+		return nil, fmt.Errorf("database error: %v", err)
+	}
+	defer tx.Rollback(ctx) // No-op once committed
+
+	batch := &pgx.Batch{}
+	for _, msg := range msgs {
+		batch.Queue(
+			"INSERT INTO messages (sender_id, recipient_id, sender_blob, recipient_blob) VALUES ($1, $2, $3, $4) RETURNING id, timestamp",
+			senderID, recipientIDs[msg.RecipientUsername], msg.SenderBlob, msg.RecipientBlob,
+		)
 	}
 
-	var newID int
-	// Use QueryRow with RETURNING id to get the new message's ID
-	err = s.db.QueryRow(ctx,
-		"INSERT INTO messages (sender_id, recipient_id, sender_blob, recipient_blob) VALUES ($1, $2, $3, $4) RETURNING id",
-		senderID, recipientID, senderBlob, recipientBlob,
-	).Scan(&newID)
+	results := tx.SendBatch(ctx, batch)
+	sent := make([]SentMessage, len(msgs))
+	for i, msg := range msgs {
+		sent[i].RecipientID = recipientIDs[msg.RecipientUsername]
+		if err := results.QueryRow().Scan(&sent[i].ID, &sent[i].Timestamp); err != nil {
+			results.Close()
+			return nil, fmt.Errorf("database error: %v", err)
+		}
+	}
+	if err := results.Close(); err != nil {
+		return nil, fmt.Errorf("database error: %v", err)
+	}
 
+	if err := tx.Commit(ctx); err != nil {
+		return nil, fmt.Errorf("database error: %v", err)
+	}
+
+	for _, m := range sent {
+		s.observeLastMessage(newConversationKey(senderID, m.RecipientID), m.ID)
+	}
+	return sent, nil
+}
+
+// lookupUserIDs resolves usernames to IDs in a single query. Usernames that do
+// not exist are simply absent from the returned map.
+func (s *PostgresStore) lookupUserIDs(ctx context.Context, usernames []string) (map[string]int, error) {
+	rows, err := s.db.Query(ctx, "SELECT username, id FROM users WHERE username = ANY($1)", usernames)
 	if err != nil {
-		return 0, 0, fmt.Errorf("database error: %v", err)
+		return nil, fmt.Errorf("database error: %v", err)
 	}
-	return newID, recipientID, nil
+	defer rows.Close()
+
+	ids := make(map[string]int, len(usernames))
+	for rows.Next() {
+		var username string
+		var id int
+		if err := rows.Scan(&username, &id); err != nil {
+			return nil, fmt.Errorf("database scan error: %v", err)
+		}
+		ids[username] = id
+		s.userIDs.Set(username, id)
+	}
+	if err := rows.Err(); err != nil {
+		return nil, fmt.Errorf("database error: %v", err)
+	}
+	return ids, nil
 }
 
 // Message struct for get_messages response
@@ -338,66 +506,76 @@ type Message struct {
 	EncryptedBlob  string    `json:"encrypted_blob"`
 }
 
-// --- NEW FUNCTION ---
-// GetMessageForUser fetches a single message, formatted for a specific user's perspective (to get the correct blob).
-func (s *PostgresStore) GetMessageForUser(ctx context.Context, messageID int, perspectiveUserID int) (*Message, error) {
-	var msg Message
-	// This query is based on GetMessages, but for a single ID
-	err := s.db.QueryRow(ctx,
-		`
-        SELECT 
-            m.id, 
-            m.sender_id, 
-            m.recipient_id, 
-            m.timestamp, 
-            u_sender.username AS sender_username,
-            CASE
-                WHEN m.sender_id = $1 THEN m.sender_blob
-                ELSE m.recipient_blob
-            END AS encrypted_blob
-        FROM messages m
-        JOIN users u_sender ON u_sender.id = m.sender_id
-        WHERE m.id = $2
-        `,
-		perspectiveUserID, messageID,
-	).Scan(&msg.ID, &msg.SenderID, &msg.RecipientID, &msg.Timestamp, &msg.SenderUsername, &msg.EncryptedBlob)
-
+// GetMessages fetches up to limit messages between two users with IDs between
+// sinceID and beforeID (both exclusive; 0 means unbounded), oldest first.
+// Clients page forward by passing the last ID they received as sinceID. With a
+// sinceID of 0 the most recent page below beforeID is returned instead, so
+// passing the first ID they hold as beforeID pages back through history.
+func (s *PostgresStore) GetMessages(ctx context.Context, myID int, partnerUsername string, sinceID int, beforeID int, limit int) ([]Message, error) {
+	partnerID, err := s.GetUserIDByUsername(ctx, partnerUsername)
 	if err != nil {
-		if err == pgx.ErrNoRows {
-			return nil, fmt.Errorf("message not found")
-		}
-		return nil, fmt.Errorf("database scan error: %v", err)
+		return nil, fmt.Errorf("partner user not found")
 	}
-	return &msg, nil
-}
 
-// GetMessages fetches new messages between two users.
-func (s *PostgresStore) GetMessages(ctx context.Context, myID int, partnerUsername string, sinceID int) ([]Message, error) {
-	partnerID, err := s.GetUserIDByUsername(ctx, partnerUsername)
+	// Most polls find nothing new; answer those from the cache.
+	lastID, err := s.lastMessageID(ctx, myID, partnerID)
 	if err != nil {
-		return nil, fmt.Errorf("partner user not found")
+		return nil, fmt.Errorf("database error: %v", err)
+	}
+	if sinceID >= lastID {
+		return nil, nil
 	}
 
-	rows, err := s.db.Query(ctx,
+	// One index-ordered seek per direction on (sender_id, recipient_id, id),
+	// each stopping after limit rows, merged by id. An OR of the two
+	// directions can't be walked in index order, so it would need a sort.
+	// Each direction also knows which blob is ours, so no per-row CASE.
+	// On an initial or history load the seeks run backwards from beforeID so
+	// they can still stop after limit rows; the page is flipped back below.
+	newestFirst := sinceID == 0
+	order := "ASC"
+	if newestFirst {
+		order = "DESC"
+	}
+	if beforeID <= 0 {
+		beforeID = math.MaxInt32 // messages.id is a SERIAL
+	}
+	rows, err := s.db.Query(ctx, fmt.Sprintf(
 		`
-        SELECT 
-            m.id, 
-            m.sender_id, 
-            m.recipient_id, 
-            m.timestamp, 
-            u_sender.username AS sender_username,
-            CASE
-                WHEN m.sender_id = $1 THEN m.sender_blob
-                ELSE m.recipient_blob
-            END AS encrypted_blob
-        FROM messages m
-        JOIN users u_sender ON u_sender.id = m.sender_id
-        WHERE 
-            ((m.sender_id = $1 AND m.recipient_id = $2) OR (m.sender_id = $2 AND m.recipient_id = $1))
-            AND m.id > $3
-        ORDER BY m.timestamp ASC
-        `,
-		myID, partnerID, sinceID)
+        (
+            SELECT 
+                m.id, 
+                m.sender_id, 
+                m.recipient_id, 
+                m.timestamp, 
+                u_sender.username AS sender_username,
+                m.sender_blob AS encrypted_blob -- my own messages: my copy
+            FROM messages m
+            JOIN users u_sender ON u_sender.id = m.sender_id
+            WHERE m.sender_id = $1 AND m.recipient_id = $2 AND m.id > $3 AND m.id < $5
+            ORDER BY m.id %[1]s
+            LIMIT $4
+        )
+        UNION ALL
+        (
+            SELECT 
+                m.id, 
+                m.sender_id, 
+                m.recipient_id, 
+                m.timestamp, 
+                u_sender.username AS sender_username,
+                m.recipient_blob AS encrypted_blob -- partner's messages: the copy for me
+            FROM messages m
+            JOIN users u_sender ON u_sender.id = m.sender_id
+            -- $1 <> $2 keeps a conversation with yourself from being returned twice
+            WHERE m.sender_id = $2 AND m.recipient_id = $1 AND m.id > $3 AND m.id < $5 AND $1 <> $2
+            ORDER BY m.id %[1]s
+            LIMIT $4
+        )
+        ORDER BY id %[1]s
+        LIMIT $4
+        `, order),
+		myID, partnerID, sinceID, limit, beforeID)
 
 	if err != nil {
 		return nil, fmt.Errorf("database error: %v", err)
@@ -412,5 +590,11 @@ func (s *PostgresStore) GetMessages(ctx context.Context, myID int, partnerUserna
 		}
 		messages = append(messages, msg)
 	}
+
+	if newestFirst {
+		for i, j := 0, len(messages)-1; i < j; i, j = i+1, j-1 {
+			messages[i], messages[j] = messages[j], messages[i]
+		}
+	}
 	return messages, nil
 }
@@ -34,4 +34,14 @@ CREATE TABLE IF NOT EXISTS messages (
     timestamp TIMESTAMPTZ NOT NULL DEFAULT (NOW() AT TIME ZONE 'UTC'),
     FOREIGN KEY (sender_id) REFERENCES users (id) ON DELETE CASCADE,
     FOREIGN KEY (recipient_id) REFERENCES users (id) ON DELETE CASCADE
-);
\ No newline at end of file
+);
+
+-- Lookups of a user's chat requests by direction and status
+-- (get_contacts, get_chat_requests)
+CREATE INDEX IF NOT EXISTS idx_chat_requests_requester_status ON chat_requests (requester_id, status);
+CREATE INDEX IF NOT EXISTS idx_chat_requests_requested_status ON chat_requests (requested_id, status);
+
+-- Conversation lookups: (sender, recipient) pairs filtered by since_id / before_id (get_messages).
+-- The reverse index also serves the recipient_id foreign key on cascade deletes.
+CREATE INDEX IF NOT EXISTS idx_messages_pair ON messages (sender_id, recipient_id, id);
+CREATE INDEX IF NOT EXISTS idx_messages_pair_rev ON messages (recipient_id, sender_id, id);
@@ -7,6 +7,11 @@ import (
 	"sync"
 )
 
+// Number of pushes that can be queued for the hub. PushToUser never blocks, so
+// without a buffer a handler pushing several messages in a row (e.g. a
+// /send_messages batch) would find the hub busy and drop them.
+const pushBufferSize = 256
+
 // Hub manages all active clients and broadcasts messages.
 type Hub struct {
 	// Registered clients. Maps userID -> Client
@@ -24,7 +29,7 @@ type Hub struct {
 // MessageJob is a task for the hub to send a message to a specific user
 type MessageJob struct {
 	UserID  int
-	Message interface{} // The store.Message object
+	Payload []byte // The JSON-encoded store.Message object
 }
 
 func NewHub() *Hub {
@@ -32,7 +37,7 @@ func NewHub() *Hub {
 		clients:    make(map[int]*Client),
 		register:   make(chan *Client),
 		unregister: make(chan *Client),
-		push:       make(chan *MessageJob),
+		push:       make(chan *MessageJob, pushBufferSize),
 	}
 }
 
@@ -66,28 +71,27 @@ func (h *Hub) Run() {
 			h.mu.Unlock()
 
 		case job := <-h.push:
+			// Hold the lock across the send so a concurrent unregister cannot
+			// close client.send underneath us; the send itself never blocks.
 			h.mu.Lock()
 			client, ok := h.clients[job.UserID]
-			h.mu.Unlock()
-
 			if ok {
-				// Convert the message to JSON
-				jsonData, err := json.Marshal(job.Message)
-				if err != nil {
-					log.Printf("WS: Failed to marshal message for user %d: %v", job.UserID, err)
-					continue
-				}
-
 				// Send to the client's buffered channel
 				select {
-				case client.send <- jsonData:
+				case client.send <- job.Payload:
 					// Message queued successfully
 				default:
 					// Client's queue is full, they are too slow. Disconnect them.
+					// This runs on the hub goroutine, so remove the client here
+					// rather than sending to h.unregister, which only we drain.
+					delete(h.clients, job.UserID)
+					close(client.send)
 					log.Printf("WS: Client queue full for user %d. Disconnecting.", job.UserID)
-					h.unregister <- client
 				}
-			} else {
+			}
+			h.mu.Unlock()
+
+			if !ok {
 				log.Printf("WS: User %d not connected, cannot push message.", job.UserID)
 			}
 		}
@@ -95,10 +99,18 @@ func (h *Hub) Run() {
 }
 
 // PushToUser is the public method called by handlers to send a message.
+// The message is encoded here, on the caller's goroutine, so the hub's single
+// event loop only routes bytes and never spends time serializing.
 func (h *Hub) PushToUser(userID int, message interface{}) {
+	jsonData, err := json.Marshal(message)
+	if err != nil {
+		log.Printf("WS: Failed to marshal message for user %d: %v", userID, err)
+		return
+	}
+
 	job := &MessageJob{
 		UserID:  userID,
-		Message: message,
+		Payload: jsonData,
 	}
 	// Send the job to the hub's push channel (non-blocking)
 	select {